@@ -1,14 +1,18 @@
 from flask import Flask, render_template, jsonify, request
 import threading
+import atexit
 from datetime import datetime
 
 from config import *
 from modules.data_module import DataModule
 from modules.strategy_module import StrategyModule
 from modules.execution_module import ExecutionModule
-from modules.persistence_module import PersistenceModule
+from modules.persistence_module import PersistenceModule, BackgroundWriter
 from modules.scheduler_module import SchedulerModule
 from modules.llm_module import LLMModule  # ADD THIS LINE
+from modules.replay_module import DecisionRecorder, ReplayLLMModule
+from modules.state_module import StateModule
+from modules.risk_module import RiskModule, confidence_label
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,12 +24,20 @@ data_module = DataModule(WATCHLIST)
 strategy_module = StrategyModule()
 execution_module = ExecutionModule()
 persistence_module = PersistenceModule(STATE_FILE)
+risk_module = RiskModule()
 
-# Global state
-state = persistence_module.load_state()
+# Global state (written by the tick/control handlers, read via snapshots)
+state_writer = BackgroundWriter(persistence_module)
+state_store = StateModule(persistence_module.load_state(), state_writer)
 scheduler = None
 logs = []
 
+@atexit.register
+def flush_state():
+    """Make sure the last queued snapshot reaches disk before exit."""
+    state_writer.flush(timeout=5.0)
+    state_writer.stop()
+
 def add_log(message: str):
     """Add timestamped log message."""
     timestamp = datetime.now().strftime('%H:%M:%S')
@@ -36,8 +48,16 @@ def add_log(message: str):
 
 
 # ADD THESE LINES:
-if USE_LLM:
-    llm_module = LLMModule(LLM_MODEL)
+if USE_LLM and LLM_REPLAY_FILE:
+    llm_module = ReplayLLMModule(LLM_REPLAY_FILE, LLM_MODEL)
+    add_log(f"⏪ Replaying LLM decisions from {LLM_REPLAY_FILE}")
+elif USE_LLM:
+    recorder = None
+    if LLM_RECORD_FILE:
+        recorder = DecisionRecorder(LLM_RECORD_FILE, LLM_RECORD_MAX_BYTES)
+        atexit.register(recorder.close)
+    llm_module = LLMModule(LLM_MODEL, stream=LLM_STREAMING,
+                           keep_alive=LLM_KEEP_ALIVE, recorder=recorder)
     add_log(f"🤖 LLM Module initialized with {LLM_MODEL}")
 else:
     llm_module = None
@@ -57,7 +77,8 @@ def agent_tick():
         add_log("⚠️ No price data available")
         return
     
-    state['last_prices'] = prices
+    with state_store.edit() as state:
+        state['last_prices'] = prices
     add_log(f"📊 Fetched prices: {len(prices)} symbols")
     
     # 2. Process each symbol
@@ -71,6 +92,7 @@ def agent_tick():
         hist_data = data_module.get_historical_data(symbol)
         if hist_data.empty:
             continue
+        risk_module.update_history(symbol, hist_data)
         
         # # Calculate indicators
         # indicators = strategy_module.calculate_indicators(hist_data)
@@ -83,47 +105,65 @@ def agent_tick():
 
         # Calculate indicators
         indicators = strategy_module.calculate_indicators(hist_data)
-        state['indicators'][symbol] = indicators
+        with state_store.edit('indicators') as state:
+            state['indicators'][symbol] = indicators
 
-        # Decide action (LLM or traditional)
+        # Decide action (LLM or traditional) from the published snapshot,
+        # so slow inference doesn't hold the state lock
+        snapshot = state_store.snapshot()
         if USE_LLM and llm_module:
             action, reason = llm_module.analyze_trade(
                 symbol, current_price, indicators,
-                state['holdings'], state['trades']
+                snapshot['holdings'], snapshot['trades']
             )
         else:
             action, reason = strategy_module.decide_action(
-                symbol, current_price, indicators, state['holdings']
+                symbol, current_price, indicators, snapshot['holdings']
             )
         
         # Execute trade if not hold
         if action == 'buy':
-            trade = execution_module.execute_buy(
-                symbol, current_price, state['cash'],
-                state['holdings'], reason
-            )
+            with state_store.edit('holdings',
+                                  append_only=['trades']) as state:
+                trade = execution_module.execute_buy(
+                    symbol, current_price, state['cash'],
+                    state['holdings'], reason
+                )
+                if trade:
+                    state['cash'] -= trade['total']
+                    state['trades'].append(trade)
             if trade:
-                state['cash'] -= trade['total']
-                state['trades'].append(trade)
                 add_log(f"✅ BUY {symbol}: {trade['quantity']} @ "
                        f"₹{current_price:.2f} | {reason}")
             else:
                 add_log(f"⚠️ BUY {symbol} failed (insufficient funds/positions)")
         
         elif action == 'sell':
-            trade = execution_module.execute_sell(
-                symbol, current_price, state['holdings'], reason
-            )
+            with state_store.edit('holdings',
+                                  append_only=['trades']) as state:
+                trade = execution_module.execute_sell(
+                    symbol, current_price, state['holdings'], reason
+                )
+                if trade:
+                    state['cash'] += trade['total']
+                    state['trades'].append(trade)
             if trade:
-                state['cash'] += trade['total']
-                state['trades'].append(trade)
                 pl_emoji = '🟢' if trade['profit_loss'] > 0 else '🔴'
                 add_log(f"{pl_emoji} SELL {symbol}: {trade['quantity']} @ "
                        f"₹{current_price:.2f} | P/L: ₹{trade['profit_loss']:.2f}")
     
-    # 3. Save state
-    persistence_module.save_state(state)
-    add_log(f"💾 State saved | Cash: ₹{state['cash']:.2f}")
+    # 3. Save state (written to disk by the background writer)
+    state_store.save()
+    snapshot = state_store.snapshot()
+    add_log(f"💾 State saved | Cash: ₹{snapshot['cash']:.2f}")
+
+    # 4. Refresh risk estimate for the new holdings (cached for /api/risk)
+    risk = risk_module.assess(snapshot['cash'], snapshot['holdings'],
+                              snapshot['last_prices'])
+    label = confidence_label(max(risk_module.confidence))
+    if label in risk['var']:
+        add_log(f"📉 VaR{label}: ₹{risk['var'][label]:.2f} | "
+               f"CVaR{label}: ₹{risk['cvar'][label]:.2f}")
 
 # ===== API ENDPOINTS =====
 
@@ -135,6 +175,7 @@ def index():
 @app.route('/api/status')
 def api_status():
     """Return current state as JSON."""
+    state = state_store.snapshot()
     portfolio = execution_module.calculate_portfolio_value(
         state['cash'], state['holdings'], state.get('last_prices', {})
     )
@@ -162,11 +203,26 @@ def api_status():
         'market_hours': f"{MARKET_OPEN} - {MARKET_CLOSE}"
     })
 
+@app.route('/api/risk')
+def api_risk():
+    """Return Monte Carlo VaR/CVaR and drawdown for current holdings."""
+    state = state_store.snapshot()
+    return jsonify(risk_module.assess(
+        state['cash'], state['holdings'], state.get('last_prices', {})
+    ))
+
 @app.route('/api/logs')
 def api_logs():
     """Return recent log messages."""
     return jsonify({'logs': logs[-50:][::-1]})  # Last 50, newest first
 
+@app.route('/api/replay')
+def api_replay():
+    """Return replay hit/miss counts when replaying recorded LLM decisions."""
+    if not isinstance(llm_module, ReplayLLMModule):
+        return jsonify({'replay': False})
+    return jsonify({'replay': True, **llm_module.report()})
+
 @app.route('/api/control', methods=['POST'])
 def api_control():
     """Handle start/pause/stop commands."""
@@ -174,35 +230,49 @@ def api_control():
     
     action = request.json.get('action')
     
+    # Decide the status change under the state lock, then drive the
+    # scheduler outside it so a running tick never waits on this handler
     if action == 'start':
-        if state['status'] == 'stopped':
-            state['status'] = 'running'
+        with state_store.edit() as state:
+            previous = state['status']
+            if previous in ['stopped', 'paused']:
+                state['status'] = 'running'
+
+        if previous == 'stopped':
             scheduler = SchedulerModule(agent_tick)
             thread = threading.Thread(target=scheduler.start, daemon=True)
             thread.start()
             add_log("🚀 Agent started")
             return jsonify({'success': True, 'message': 'Agent started'})
-        elif state['status'] == 'paused':
-            state['status'] = 'running'
+        elif previous == 'paused':
             scheduler.resume()
             return jsonify({'success': True, 'message': 'Agent resumed'})
         else:
             return jsonify({'success': False, 'message': 'Already running'})
     
     elif action == 'pause':
-        if state['status'] == 'running' and scheduler:
-            state['status'] = 'paused'
+        with state_store.edit() as state:
+            can_pause = state['status'] == 'running' and scheduler is not None
+            if can_pause:
+                state['status'] = 'paused'
+
+        if can_pause:
             scheduler.pause()
-            persistence_module.save_state(state)
+            state_store.save()
             return jsonify({'success': True, 'message': 'Agent paused'})
         else:
             return jsonify({'success': False, 'message': 'Not running'})
     
     elif action == 'stop':
-        if scheduler and state['status'] in ['running', 'paused']:
-            state['status'] = 'stopped'
+        with state_store.edit() as state:
+            can_stop = (scheduler is not None and
+                        state['status'] in ['running', 'paused'])
+            if can_stop:
+                state['status'] = 'stopped'
+
+        if can_stop:
             scheduler.stop()
-            persistence_module.save_state(state)
+            state_store.save()
             add_log("⏹️ Agent stopped")
             return jsonify({'success': True, 'message': 'Agent stopped'})
         else:
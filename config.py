@@ -31,4 +31,20 @@ STATE_FILE = 'data/state.json'
 
 # LLM Configuration
 USE_LLM = True  # Set to False to use traditional strategy
-LLM_MODEL = "mistral"  # Options: llama3.2, mistral, phi3, gemma2
\ No newline at end of file
+LLM_MODEL = "mistral"  # Options: llama3.2, mistral, phi3, gemma2
+LLM_STREAMING = True  # Stop generation as soon as ACTION/REASON are parsed
+LLM_KEEP_ALIVE = '30m'  # Keep the model loaded in Ollama between ticks
+LLM_RECORD_FILE = 'data/llm_decisions.jsonl'  # Log every decision; None to disable
+LLM_RECORD_MAX_BYTES = 50 * 1024 * 1024  # Rotate the log to <file>.1 past this size
+# Set to a recorded log to answer from it instead of calling Ollama. Prompts
+# are matched exactly, so replay only hits when the bar inputs (indicators,
+# position, recent trades) are identical to the recorded session; with live
+# yfinance prices nearly every prompt misses and is answered with HOLD.
+LLM_REPLAY_FILE = None
+
+# Risk Configuration (Monte Carlo over stored 15m bars)
+RISK_SIMULATIONS = 20000     # Bootstrapped paths per estimate
+RISK_HORIZON_BARS = 25       # ~1 trading day of 15m bars
+RISK_CONFIDENCE = [0.95, 0.99]
+RISK_MIN_BARS = 30           # Minimum aligned bars before simulating
+RISK_SEED = None             # Set an int for reproducible paths
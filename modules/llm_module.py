@@ -1,25 +1,116 @@
 import ollama
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
+import hashlib
 import json
+import time
+
+
+# Fixed system prompt. Kept byte-identical across calls so Ollama can reuse
+# the evaluated prefix instead of re-processing the rules every tick.
+SYSTEM_PROMPT = """You are an expert stock trader. Analyze the data you are given and decide: BUY, SELL, or HOLD.
+
+**Rules:**
+1. If you don't own the stock, consider BUY if:
+   - MA crossover (short crosses above long) + RSI < 50
+   - RSI < 30 (oversold)
+2. If you own the stock, consider SELL if:
+   - MA crossover (short crosses below long)
+   - RSI > 70 (overbought)
+   - Profit target met
+3. Otherwise HOLD
+
+Respond ONLY in this exact format:
+ACTION: <BUY|SELL|HOLD>
+REASON: <brief explanation in one line>"""
+
+
+def prompt_hash(prompt: str) -> str:
+    """Stable key for a prompt, covering the system prefix and user message."""
+    digest = hashlib.sha256()
+    digest.update(SYSTEM_PROMPT.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(prompt.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class StreamingDecisionParser:
+    """Incrementally parse ACTION/REASON lines from streamed tokens."""
+
+    def __init__(self):
+        self.text = ''  # Everything received, for recording
+        self.buffer = ''
+        self.action = None
+        self.reason = None
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Consume a chunk of streamed text.
+
+        Returns True once both the ACTION and REASON lines are complete,
+        meaning the rest of the generation can be discarded.
+        """
+        self.text += chunk
+        self.buffer += chunk
+        while '\n' in self.buffer:
+            line, self.buffer = self.buffer.split('\n', 1)
+            self._parse_line(line)
+            if self.done:
+                return True
+        return False
+
+    def finish(self):
+        """Parse whatever is left once the stream ends."""
+        if self.buffer:
+            self._parse_line(self.buffer)
+            self.buffer = ''
+
+    @property
+    def done(self) -> bool:
+        return self.action is not None and self.reason is not None
+
+    def _parse_line(self, line: str):
+        line = line.strip()
+        if line.startswith('ACTION:') and self.action is None:
+            action_str = line.replace('ACTION:', '').strip().lower()
+            if action_str in ['buy', 'sell', 'hold']:
+                self.action = action_str
+        elif line.startswith('REASON:') and self.reason is None:
+            self.reason = line.replace('REASON:', '').strip()
 
 
 class LLMModule:
     """AI decision-making using local Ollama LLM."""
 
-    def __init__(self, model: str = "llama3.2"):
+    def __init__(self, model: str = "llama3.2", stream: bool = True,
+                 keep_alive: Optional[Union[float, str]] = None,
+                 recorder=None, connect: bool = True,
+                 host: Optional[str] = None):
         """
         Initialize Ollama client.
 
         Args:
             model: Ollama model name (llama3.2, mistral, phi3, etc.)
+            stream: Parse tokens as they arrive and stop generation as
+                soon as the decision is complete
+            keep_alive: How long Ollama keeps the model loaded between
+                calls (e.g. '30m'); None uses the server default
+            recorder: Optional DecisionRecorder that logs every decision
+                for later replay
+            connect: Check that Ollama is reachable on startup
+            host: Ollama server URL; None uses OLLAMA_HOST or the default
         """
         self.model = model
-        self._test_connection()
+        self.stream = stream
+        self.keep_alive = keep_alive
+        self.recorder = recorder
+        self.client = ollama.Client(host=host)
+        if connect:
+            self._test_connection()
 
     def _test_connection(self):
         """Test if Ollama is running."""
         try:
-            ollama.list()
+            self.client.list()
             print(f"✅ Ollama connected - using model: {self.model}")
         except Exception as e:
             print(f"⚠️ Ollama not running. Start with: ollama serve")
@@ -40,33 +131,94 @@ class LLMModule:
         prompt = self._build_prompt(symbol, current_price, indicators,
                                     holdings, recent_trades)
 
-        try:
-            # Call Ollama
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt
-                }],
-                options={
-                    'temperature': 0.3,  # Lower = more conservative
-                    'num_predict': 150  # Limit response length
-                }
-            )
-
-            # Parse LLM response
-            content = response['message']['content'].strip()
-            action, reason = self._parse_response(content)
-
-            return action, reason
+        # Inputs behind the prompt, for recording and replay reports
+        inputs = {
+            'symbol': symbol,
+            'price': current_price,
+            'indicators': indicators,
+            'position': holdings.get(symbol),
+            'recent_trades': recent_trades[-3:]
+        }
 
+        try:
+            start = time.perf_counter()
+            action, reason, raw = self._infer(prompt, inputs)
+            latency_ms = (time.perf_counter() - start) * 1000
         except Exception as e:
             print(f"❌ LLM error: {e}")
             return 'hold', f'LLM error: {str(e)}'
 
+        if self.recorder:
+            self.recorder.record(prompt_hash(prompt), inputs, self.model,
+                                 raw, action, reason, latency_ms)
+
+        return action, reason
+
+    def _infer(self, prompt: str, inputs: Dict) -> tuple[str, str, str]:
+        """
+        Run the model on a prompt.
+
+        Returns: (action, reason, raw response text)
+        """
+        if self.stream:
+            return self._stream_decision(prompt)
+
+        # Call Ollama
+        response = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(prompt),
+            options=self._options(),
+            keep_alive=self.keep_alive
+        )
+
+        # Parse LLM response
+        content = response['message']['content'].strip()
+        action, reason = self._parse_response(content)
+
+        return action, reason, content
+
+    def _stream_decision(self, prompt: str) -> tuple[str, str, str]:
+        """Stream the completion and stop once ACTION and REASON are parsed."""
+        parser = StreamingDecisionParser()
+        stream = self.client.chat(
+            model=self.model,
+            messages=self._build_messages(prompt),
+            options=self._options(),
+            keep_alive=self.keep_alive,
+            stream=True
+        )
+
+        try:
+            for chunk in stream:
+                if parser.feed(chunk['message']['content']):
+                    break
+                if chunk.get('done'):
+                    break
+        finally:
+            # Closing the generator drops the HTTP stream, which makes
+            # Ollama abort the remaining generation
+            stream.close()
+
+        parser.finish()
+        action, reason = self._decision(parser)
+        return action, reason, parser.text
+
+    def _build_messages(self, prompt: str) -> list:
+        """Fixed system prefix followed by the per-symbol prompt."""
+        return [
+            {'role': 'system', 'content': SYSTEM_PROMPT},
+            {'role': 'user', 'content': prompt}
+        ]
+
+    def _options(self) -> Dict:
+        return {
+            'temperature': 0.3,  # Lower = more conservative
+            'num_predict': 150  # Limit response length
+        }
+
     def _build_prompt(self, symbol: str, price: float, indicators: Dict,
                       holdings: Dict, recent_trades: list) -> str:
-        """Build trading decision prompt."""
+        """Build the per-symbol part of the prompt (rules live in SYSTEM_PROMPT)."""
 
         has_position = symbol in holdings
         position_info = ""
@@ -82,9 +234,7 @@ class LLMModule:
                 for t in last_3
             ])
 
-        prompt = f"""You are an expert stock trader. Analyze this data and decide: BUY, SELL, or HOLD.
-
-Stock: {symbol}
+        prompt = f"""Stock: {symbol}
 Current Price: ₹{price:.2f}
 
 Technical Indicators:
@@ -98,35 +248,19 @@ Technical Indicators:
 Recent Trade History:
 {recent_trades_str if recent_trades_str else "  No recent trades"}
 
-**Rules:**
-1. If you don't own the stock, consider BUY if:
-   - MA crossover (short crosses above long) + RSI < 50
-   - RSI < 30 (oversold)
-2. If you own the stock, consider SELL if:
-   - MA crossover (short crosses below long)
-   - RSI > 70 (overbought)
-   - Profit target met
-3. Otherwise HOLD
-
-Respond ONLY in this exact format:
-ACTION: <BUY|SELL|HOLD>
-REASON: <brief explanation in one line>"""
+Decide now."""
 
         return prompt
 
     def _parse_response(self, content: str) -> tuple[str, str]:
         """Parse LLM response into action and reason."""
-        action = 'hold'
-        reason = 'Could not parse LLM response'
-
-        lines = content.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('ACTION:'):
-                action_str = line.replace('ACTION:', '').strip().lower()
-                if action_str in ['buy', 'sell', 'hold']:
-                    action = action_str
-            elif line.startswith('REASON:'):
-                reason = line.replace('REASON:', '').strip()
+        parser = StreamingDecisionParser()
+        parser.feed(content.strip())
+        parser.finish()
+        return self._decision(parser)
 
+    def _decision(self, parser: StreamingDecisionParser) -> tuple[str, str]:
+        """Turn parsed lines into (action, reason), defaulting to hold."""
+        action = parser.action or 'hold'
+        reason = parser.reason or 'Could not parse LLM response'
         return action, f"[LLM] {reason}"
\ No newline at end of file
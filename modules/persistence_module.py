@@ -1,7 +1,8 @@
 import json
 import os
+import threading
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class PersistenceModule:
     """Handles saving/loading agent state to/from disk."""
@@ -15,11 +16,11 @@ class PersistenceModule:
         os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
     
     def save_state(self, state: Dict[str, Any]) -> bool:
-        """Save current state atomically to JSON."""
+        """Save current state atomically to JSON (does not modify `state`)."""
         try:
             # Write to temp file first, then rename (atomic)
             temp_path = f"{self.filepath}.tmp"
-            state['last_saved'] = datetime.now().isoformat()
+            state = dict(state, last_saved=datetime.now().isoformat())
             
             with open(temp_path, 'w') as f:
                 json.dump(state, f, indent=2, default=str)
@@ -53,4 +54,60 @@ class PersistenceModule:
             'last_prices': {},
             'indicators': {},
             'created_at': datetime.now().isoformat()
-        }
\ No newline at end of file
+        }
+
+
+class BackgroundWriter:
+    """
+    Saves state snapshots on a dedicated thread.
+
+    Only the most recent pending snapshot is kept, so a burst of saves
+    turns into a single write and callers never wait on disk I/O.
+    """
+
+    def __init__(self, persistence: PersistenceModule):
+        self.persistence = persistence
+        self._pending: Optional[Dict[str, Any]] = None
+        self._writing = False
+        self._running = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='state-writer')
+        self._thread.start()
+
+    def submit(self, snapshot: Dict[str, Any]):
+        """Queue a snapshot for saving, replacing any not yet written."""
+        with self._cond:
+            self._pending = snapshot
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far is on disk."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._pending is None and not self._writing, timeout
+            )
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Write any pending snapshot and stop the thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._pending is not None or not self._running
+                )
+                if self._pending is None:
+                    return
+                snapshot, self._pending = self._pending, None
+                self._writing = True
+
+            self.persistence.save_state(snapshot)
+
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
@@ -0,0 +1,177 @@
+import json
+import os
+import queue
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from modules.llm_module import LLMModule, prompt_hash
+
+
+class DecisionRecorder:
+    """
+    Appends every LLM decision to a compact JSON-lines log.
+
+    Records are queued and written by a dedicated thread that keeps the
+    file open and flushes once per batch, so the tick never waits on disk.
+    When the log passes `max_bytes` it is rotated to `<filepath>.1`.
+    """
+
+    def __init__(self, filepath: str, max_bytes: int = 50 * 1024 * 1024):
+        self.filepath = filepath
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue()
+        self._ensure_directory()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='decision-recorder')
+        self._thread.start()
+
+    def _ensure_directory(self):
+        """Create log directory if it doesn't exist."""
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, key: str, inputs: Dict, model: str, raw: str,
+               action: str, reason: str, latency_ms: float):
+        """Queue one decision for writing."""
+        entry = {
+            'ts': datetime.now().isoformat(),
+            'hash': key,
+            'model': model,
+            'inputs': inputs,
+            'raw': raw,
+            'action': action,
+            'reason': reason,
+            'latency_ms': round(latency_ms, 1)
+        }
+        self._queue.put(json.dumps(entry, separators=(',', ':'), default=str))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything recorded so far is on disk."""
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: self._queue.unfinished_tasks == 0, timeout
+            )
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Write any queued records and stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        f = None
+        while True:
+            lines = [self._queue.get()]
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batch = [line for line in lines if line is not None]
+            try:
+                if batch:
+                    f = self._write(f, batch)
+            except Exception as e:
+                print(f"❌ Decision record failed: {e}")
+                f = None
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+
+            if None in lines:
+                if f:
+                    f.close()
+                return
+
+    def _write(self, f, batch: List[str]):
+        """Append a batch, rotating the log once it grows past max_bytes."""
+        if f is None:
+            f = open(self.filepath, 'a')
+        f.write('\n'.join(batch) + '\n')
+        f.flush()
+
+        if f.tell() >= self.max_bytes:
+            f.close()
+            os.replace(self.filepath, f"{self.filepath}.1")
+            return None
+        return f
+
+
+class ReplayLLMModule(LLMModule):
+    """
+    Serves decisions from a DecisionRecorder log instead of calling Ollama.
+
+    Prompts are matched by hash, so only a rerun with identical inputs
+    (same indicator values, position and recent trades) hits; live prices
+    will almost always miss. If the same prompt was recorded more than
+    once, its decisions are served in the original order and the last one
+    is repeated after that.
+    """
+
+    def __init__(self, filepath: str, model: str = "replay",
+                 max_misses: int = 100):
+        """
+        Args:
+            filepath: DecisionRecorder log to serve decisions from
+            model: Model name reported for replayed decisions
+            max_misses: How many recent misses to keep for report()
+        """
+        super().__init__(model, stream=False, connect=False)
+        self.filepath = filepath
+        self.decisions = self._load(filepath)
+        self._served = defaultdict(int)
+        self.hits = 0
+        self.miss_count = 0
+        self.misses = deque(maxlen=max_misses)
+        print(f"⏪ Replay loaded {sum(map(len, self.decisions.values()))} "
+              f"decisions from {filepath}")
+
+    def _load(self, filepath: str) -> Dict[str, List[Dict]]:
+        """Index recorded decisions by prompt hash, keeping file order."""
+        decisions = defaultdict(list)
+        if not os.path.exists(filepath):
+            print(f"⚠️ Replay log not found: {filepath}")
+            return decisions
+
+        with open(filepath, 'r') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping corrupt replay line {line_no}")
+                    continue
+                if not isinstance(entry, dict) or 'hash' not in entry:
+                    print(f"⚠️ Skipping replay line {line_no} without hash")
+                    continue
+                decisions[entry['hash']].append(entry)
+        return decisions
+
+    def _infer(self, prompt: str, inputs: Dict) -> tuple[str, str, str]:
+        """Look up the recorded decision for this prompt."""
+        key = prompt_hash(prompt)
+        entries = self.decisions.get(key)
+        if not entries:
+            self.miss_count += 1
+            self.misses.append({'hash': key, 'inputs': inputs})
+            print(f"⚠️ Replay miss for prompt {key}")
+            return 'hold', '[REPLAY] No recorded decision', ''
+
+        index = min(self._served[key], len(entries) - 1)
+        self._served[key] += 1
+        self.hits += 1
+        entry = entries[index]
+        return entry['action'], entry['reason'], entry['raw']
+
+    def report(self) -> Dict:
+        """Summary of the replay so far, including recent prompts that missed."""
+        return {
+            'hits': self.hits,
+            'misses': self.miss_count,
+            'recent_misses': list(self.misses)
+        }
@@ -0,0 +1,173 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from config import (RISK_SIMULATIONS, RISK_HORIZON_BARS, RISK_CONFIDENCE,
+                    RISK_MIN_BARS, RISK_SEED)
+
+
+def confidence_label(level: float) -> str:
+    """Key used for a confidence level in results, e.g. 0.975 -> '97.5'."""
+    return f"{level * 100:g}"
+
+
+class RiskModule:
+    """
+    Monte Carlo risk for current holdings.
+
+    Paths are built by bootstrapping whole rows of historical bar returns,
+    so the correlation between symbols is kept without fitting a model.
+    Simulated growth paths for every symbol are cached until new bars
+    arrive; a change in holdings only re-weights the cached paths.
+    """
+
+    def __init__(self, simulations: int = RISK_SIMULATIONS,
+                 horizon: int = RISK_HORIZON_BARS,
+                 confidence: List[float] = RISK_CONFIDENCE,
+                 min_bars: int = RISK_MIN_BARS,
+                 seed: Optional[int] = RISK_SEED):
+        self.simulations = simulations
+        self.horizon = horizon
+        self.confidence = confidence
+        self.min_bars = min_bars
+        self.seed = seed
+        self.history: Dict[str, pd.Series] = {}  # symbol -> close prices
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._symbols: List[str] = []
+        self._growth = None  # (simulations, horizon, symbols) float32
+        self._simulation_ms = 0.0
+        self._cache_key = None
+        self._cache = None
+
+    def update_history(self, symbol: str, df: pd.DataFrame):
+        """
+        Store the latest bars for a symbol.
+
+        Paths are only rebuilt (lazily) when a new bar has arrived, not on
+        every tick that re-fetches the same bars.
+        """
+        if df.empty or 'Close' not in df:
+            return
+        close = df['Close'].dropna()
+        # yfinance intraday data sometimes repeats the last bar
+        close = close[~close.index.duplicated(keep='last')]
+        with self._lock:
+            previous = self.history.get(symbol)
+            if (previous is not None and len(previous) == len(close) and
+                    previous.index[-1:].equals(close.index[-1:])):
+                return
+            self.history[symbol] = close
+            self._dirty = True
+
+    def assess(self, cash: float, holdings: Dict,
+               current_prices: Dict) -> Dict:
+        """Return VaR/CVaR and drawdown stats for the given portfolio."""
+        with self._lock:
+            if self._dirty:
+                self._simulate()
+
+            key = (cash, tuple(sorted(
+                (sym, pos['quantity'], current_prices.get(sym, pos['avg_price']))
+                for sym, pos in holdings.items()
+            )))
+            if key != self._cache_key:
+                self._cache = self._evaluate(cash, holdings, current_prices)
+                self._cache_key = key
+            return self._cache
+
+    def _simulate(self):
+        """
+        Bootstrap joint return paths for every symbol with history.
+
+        Stays dirty if this raises, so the next call retries instead of
+        silently serving no estimate.
+        """
+        start = time.perf_counter()
+        self._cache_key = None
+
+        if not self.history:
+            self._set_paths(None, [])
+            return
+
+        closes = pd.concat(self.history, axis=1, join='inner').dropna()
+        if len(closes) <= self.min_bars:
+            self._set_paths(None, [])
+            return
+
+        returns = np.diff(np.log(closes.to_numpy(dtype=np.float64)), axis=0)
+        returns = returns.astype(np.float32)
+        rng = np.random.default_rng(self.seed)
+        rows = rng.integers(0, len(returns),
+                            size=(self.simulations, self.horizon))
+
+        # (simulations, horizon, symbols) cumulative growth minus one,
+        # computed in place to avoid extra copies of the path array
+        paths = returns[rows]
+        np.cumsum(paths, axis=1, out=paths)
+        np.expm1(paths, out=paths)
+        self._set_paths(paths, list(closes.columns))
+        self._simulation_ms = (time.perf_counter() - start) * 1000
+
+    def _set_paths(self, growth, symbols: List[str]):
+        self._growth = growth
+        self._symbols = symbols
+        self._dirty = False
+
+    def _evaluate(self, cash: float, holdings: Dict,
+                  current_prices: Dict) -> Dict:
+        start = time.perf_counter()
+
+        exposure = np.zeros(len(self._symbols))
+        holdings_value = 0.0
+        unmodeled = []
+        for sym, pos in holdings.items():
+            value = pos['quantity'] * current_prices.get(sym, pos['avg_price'])
+            holdings_value += value
+            if sym in self._symbols:
+                exposure[self._symbols.index(sym)] = value
+            else:
+                unmodeled.append(sym)
+
+        total_value = cash + holdings_value
+        result = {
+            'total_value': total_value,
+            'holdings_value': holdings_value,
+            'simulations': self.simulations,
+            'horizon_bars': self.horizon,
+            'unmodeled': unmodeled,
+            'simulation_ms': self._simulation_ms,
+            'var': {},
+            'cvar': {},
+            'drawdown': {}
+        }
+        if self._growth is None or not exposure.any():
+            result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+            return result
+
+        # P&L path per simulation: (simulations, horizon)
+        pnl = self._growth @ exposure.astype(np.float32)
+        losses = -pnl[:, -1]
+
+        for level in self.confidence:
+            var = float(np.quantile(losses, level))
+            tail = losses[losses >= var]
+            label = confidence_label(level)
+            result['var'][label] = var
+            result['cvar'][label] = float(tail.mean()) if tail.size else var
+
+        # Max drawdown of total portfolio value along each path
+        values = np.concatenate(
+            [np.zeros((len(pnl), 1), dtype=pnl.dtype), pnl], axis=1
+        ) + total_value
+        peaks = np.maximum.accumulate(values, axis=1)
+        max_dd = ((peaks - values) / peaks).max(axis=1)
+        result['drawdown'] = {
+            'mean': float(max_dd.mean()),
+            'p50': float(np.quantile(max_dd, 0.50)),
+            'p95': float(np.quantile(max_dd, 0.95)),
+            'p99': float(np.quantile(max_dd, 0.99))
+        }
+        result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        return result
@@ -0,0 +1,58 @@
+import copy
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator
+
+
+class StateModule:
+    """
+    Single owner of the agent state.
+
+    Writers change the state inside `edit()`, one at a time, on a new
+    top-level dict. Only when the block exits cleanly does that dict
+    replace the published snapshot, by swapping a single reference, so
+    readers never see a half-applied or failed update and never take a
+    lock. Published snapshots are never modified again and must be
+    treated as read-only.
+    """
+
+    def __init__(self, initial: Dict[str, Any], writer=None):
+        """
+        Args:
+            initial: Starting state (e.g. from PersistenceModule.load_state)
+            writer: Optional BackgroundWriter used by `save()`
+        """
+        self._lock = threading.Lock()
+        self._snapshot = copy.deepcopy(initial)
+        self.writer = writer
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the latest published state (read-only)."""
+        return self._snapshot
+
+    @contextmanager
+    def edit(self, *keys: str,
+             append_only: Iterable[str] = ()) -> Iterator[Dict[str, Any]]:
+        """
+        Change the state and publish the result if the block succeeds.
+
+        Top-level keys can always be reassigned. Values mutated in place
+        must be listed: in `keys` to be deep-copied (e.g. 'holdings'), or
+        in `append_only` for lists that are only appended to (e.g.
+        'trades'), which get a cheap shallow copy. Everything else is
+        shared with the published snapshot. Keep edit blocks short: other
+        writers wait for the lock.
+        """
+        with self._lock:
+            working = dict(self._snapshot)
+            for key in keys:
+                working[key] = copy.deepcopy(working[key])
+            for key in append_only:
+                working[key] = list(working[key])
+            yield working
+            self._snapshot = working
+
+    def save(self):
+        """Hand the latest snapshot to the background writer."""
+        if self.writer:
+            self.writer.submit(self._snapshot)
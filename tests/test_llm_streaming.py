@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('ollama')
+from modules.llm_module import LLMModule, SYSTEM_PROMPT  # noqa: E402
+
+TOKEN_DELAY = 0.01
+DECISION_TOKENS = ['ACTION', ':', ' BUY', '\n', 'REASON', ':', ' RSI',
+                   ' oversold', '\n']
+FILLER_TOKENS = [' filler'] * 40
+ALL_TOKENS = DECISION_TOKENS + FILLER_TOKENS
+FULL_COMPLETION_SECONDS = TOKEN_DELAY * len(ALL_TOKENS)
+
+INDICATORS = {'ma_short': 101.0, 'ma_long': 102.0, 'rsi': 25.0,
+              'ma_short_prev': 100.0, 'ma_long_prev': 102.5}
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Serves /api/chat as slow NDJSON, like `ollama serve`."""
+
+    protocol_version = 'HTTP/1.1'
+    requests = []
+    tokens_sent = 0
+    dropped = threading.Event()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._send_json({'models': []})
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        body = json.loads(self.rfile.read(length))
+        FakeOllamaHandler.requests.append(body)
+
+        if not body.get('stream', True):
+            self._send_json({'message': {'role': 'assistant',
+                                         'content': ''.join(ALL_TOKENS)},
+                             'done': True})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for token in ALL_TOKENS:
+                time.sleep(TOKEN_DELAY)
+                self._send_chunk({'message': {'role': 'assistant',
+                                              'content': token},
+                                  'done': False})
+                FakeOllamaHandler.tokens_sent += 1
+            self._send_chunk({'message': {'role': 'assistant', 'content': ''},
+                              'done': True})
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            FakeOllamaHandler.dropped.set()
+
+    def _send_chunk(self, payload):
+        line = json.dumps(payload).encode() + b'\n'
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+        self.wfile.flush()
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture(scope='module')
+def ollama_host():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOllamaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def reset_server():
+    FakeOllamaHandler.requests.clear()
+    FakeOllamaHandler.tokens_sent = 0
+    FakeOllamaHandler.dropped.clear()
+
+
+def test_streaming_stops_generation_once_decision_is_parsed(ollama_host):
+    llm = LLMModule('fake', stream=True, keep_alive='30m', host=ollama_host)
+
+    start = time.perf_counter()
+    action, reason = llm.analyze_trade('TCS.NS', 100.0, INDICATORS, {}, [])
+    elapsed = time.perf_counter() - start
+
+    assert (action, reason) == ('buy', '[LLM] RSI oversold')
+    assert FakeOllamaHandler.dropped.wait(timeout=5)
+    # The server notices the disconnect within a few writes
+    assert FakeOllamaHandler.tokens_sent < len(ALL_TOKENS)
+    assert elapsed < FULL_COMPLETION_SECONDS + 1
+
+
+def test_non_streaming_parses_full_completion(ollama_host):
+    llm = LLMModule('fake', stream=False, host=ollama_host)
+
+    action, reason = llm.analyze_trade('TCS.NS', 100.0, INDICATORS, {}, [])
+
+    assert (action, reason) == ('buy', '[LLM] RSI oversold')
+    assert FakeOllamaHandler.requests[0]['stream'] is False
+
+
+def test_request_uses_fixed_system_prefix_and_keep_alive(ollama_host):
+    llm = LLMModule('fake', stream=True, keep_alive='30m', host=ollama_host)
+    llm.analyze_trade('TCS.NS', 100.0, INDICATORS, {}, [])
+    llm.analyze_trade('INFY.NS', 200.0, INDICATORS, {}, [])
+
+    first, second = FakeOllamaHandler.requests
+    assert first['messages'][0] == {'role': 'system',
+                                    'content': SYSTEM_PROMPT}
+    assert second['messages'][0] == first['messages'][0]
+    assert first['keep_alive'] == '30m'
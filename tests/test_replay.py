@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+pytest.importorskip('ollama')
+from modules.llm_module import LLMModule  # noqa: E402
+from modules.replay_module import DecisionRecorder, ReplayLLMModule  # noqa: E402
+
+INDICATORS = {'ma_short': 101.0, 'ma_long': 102.0, 'rsi': 25.0,
+              'ma_short_prev': 100.0, 'ma_long_prev': 102.5}
+
+
+class ScriptedLLM(LLMModule):
+    """LLMModule that answers BUY without calling Ollama."""
+
+    def _infer(self, prompt, inputs):
+        raw = 'ACTION: BUY\nREASON: RSI oversold'
+        action, reason = self._parse_response(raw)
+        return action, reason, raw
+
+
+def test_recorded_decisions_replay_and_misses_are_reported(tmp_path):
+    log = tmp_path / 'decisions.jsonl'
+    recorder = DecisionRecorder(str(log))
+    live = ScriptedLLM('fake', connect=False, recorder=recorder)
+    assert live.analyze_trade('TCS.NS', 100.0, INDICATORS, {}, []) == \
+        ('buy', '[LLM] RSI oversold')
+    assert recorder.flush(timeout=5)
+
+    entry = json.loads(log.read_text())
+    assert entry['inputs']['symbol'] == 'TCS.NS'
+    assert entry['raw'].startswith('ACTION: BUY')
+
+    replay = ReplayLLMModule(str(log), 'fake', max_misses=1)
+    assert replay.analyze_trade('TCS.NS', 100.0, INDICATORS, {}, []) == \
+        ('buy', '[LLM] RSI oversold')
+    replay.analyze_trade('INFY.NS', 200.0, INDICATORS, {}, [])
+    replay.analyze_trade('TCS.NS', 99.0, INDICATORS, {}, [])
+
+    report = replay.report()
+    assert report['hits'] == 1
+    assert report['misses'] == 2
+    assert [m['inputs']['price'] for m in report['recent_misses']] == [99.0]
+    assert report['recent_misses'][0]['inputs']['indicators'] == INDICATORS
+
+
+def test_recorder_rotates_log_past_max_bytes(tmp_path):
+    log = tmp_path / 'decisions.jsonl'
+    recorder = DecisionRecorder(str(log), max_bytes=1)
+    recorder.record('abc', {}, 'fake', 'raw', 'hold', 'r', 1.0)
+    assert recorder.flush(timeout=5)
+    recorder.record('def', {}, 'fake', 'raw', 'hold', 'r', 1.0)
+    recorder.close()
+
+    rotated = tmp_path / 'decisions.jsonl.1'
+    assert json.loads(rotated.read_text())['hash'] == 'def'
+
+
+def test_replay_skips_lines_without_hash(tmp_path):
+    log = tmp_path / 'decisions.jsonl'
+    log.write_text('{"action":"buy"}\n[1, 2]\nnot json\n'
+                   '{"hash":"abc","action":"buy","reason":"r","raw":""}\n')
+
+    replay = ReplayLLMModule(str(log), 'fake')
+    assert list(replay.decisions) == ['abc']
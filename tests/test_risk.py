@@ -0,0 +1,89 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+from modules.risk_module import RiskModule  # noqa: E402
+
+
+def make_bars(symbols, periods=200, seed=1):
+    index = pd.date_range('2026-09-01 09:15', periods=periods, freq='15min')
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.003, periods)
+    return {
+        sym: pd.DataFrame({'Close': 100.0 * np.exp(np.cumsum(
+            common + rng.normal(0, 0.002, periods)))}, index=index)
+        for sym in symbols
+    }
+
+
+def test_var_cvar_and_drawdown_reported_per_confidence_level():
+    risk = RiskModule(simulations=2000, horizon=10,
+                      confidence=[0.95, 0.975], min_bars=30, seed=7)
+    for sym, df in make_bars(['A', 'B']).items():
+        risk.update_history(sym, df)
+
+    holdings = {'A': {'quantity': 10, 'avg_price': 100.0},
+                'Z': {'quantity': 1, 'avg_price': 50.0}}
+    result = risk.assess(5000.0, holdings, {'A': 100.0})
+
+    assert set(result['var']) == {'95', '97.5'}
+    assert result['cvar']['97.5'] >= result['var']['97.5'] > 0
+    assert result['unmodeled'] == ['Z']
+    assert 0 <= result['drawdown']['p50'] <= result['drawdown']['p99']
+
+
+def test_paths_rebuilt_only_when_a_new_bar_arrives():
+    risk = RiskModule(simulations=500, horizon=5, min_bars=30, seed=7)
+    bars = make_bars(['A'])
+    holdings = {'A': {'quantity': 10, 'avg_price': 100.0}}
+
+    risk.update_history('A', bars['A'])
+    risk.assess(1000.0, holdings, {})
+    growth = risk._growth
+
+    # Same bars re-fetched on the next tick: cached paths are kept
+    risk.update_history('A', bars['A'].copy())
+    risk.assess(1000.0, holdings, {})
+    assert risk._growth is growth
+
+    # A new bar invalidates them
+    risk.update_history('A', make_bars(['A'], periods=201)['A'])
+    risk.assess(1000.0, holdings, {})
+    assert risk._growth is not growth
+
+
+def test_no_estimate_below_min_bars():
+    risk = RiskModule(simulations=500, horizon=5, min_bars=500, seed=7)
+    risk.update_history('A', make_bars(['A'])['A'])
+    result = risk.assess(1000.0, {'A': {'quantity': 1, 'avg_price': 100.0}},
+                         {})
+    assert result['var'] == {}
+
+
+def test_duplicate_timestamps_are_dropped():
+    risk = RiskModule(simulations=500, horizon=5, min_bars=30, seed=7)
+    bars = make_bars(['A', 'B'])
+    repeated = pd.concat([bars['A'], bars['A'].iloc[-1:]])
+    risk.update_history('A', repeated)
+    risk.update_history('B', bars['B'])
+
+    result = risk.assess(1000.0, {'A': {'quantity': 10, 'avg_price': 100.0}},
+                         {})
+    assert result['var']
+    assert not risk.history['A'].index.duplicated().any()
+
+
+def test_failed_simulation_is_retried(monkeypatch):
+    risk = RiskModule(simulations=500, horizon=5, min_bars=30, seed=7)
+    risk.update_history('A', make_bars(['A'])['A'])
+    holdings = {'A': {'quantity': 10, 'avg_price': 100.0}}
+
+    def broken_concat(*args, **kwargs):
+        raise ValueError('cannot reindex on an axis with duplicate labels')
+
+    with monkeypatch.context() as m:
+        m.setattr(pd, 'concat', broken_concat)
+        with pytest.raises(ValueError):
+            risk.assess(1000.0, holdings, {})
+
+    assert risk.assess(1000.0, holdings, {})['var']
@@ -0,0 +1,91 @@
+import json
+import threading
+
+import pytest
+
+from modules.persistence_module import PersistenceModule, BackgroundWriter
+from modules.state_module import StateModule
+
+
+def make_state():
+    return {'cash': 1000.0, 'holdings': {}, 'trades': [], 'status': 'stopped',
+            'last_prices': {'X': 10.0}}
+
+
+def test_failed_edit_is_not_published():
+    store = StateModule(make_state())
+
+    with pytest.raises(RuntimeError):
+        with store.edit('holdings') as state:
+            state['holdings']['X'] = {'quantity': 1, 'avg_price': 10.0}
+            state['cash'] -= 10.0
+            raise RuntimeError('execution failed')
+
+    with store.edit() as state:
+        state['status'] = 'running'
+
+    snapshot = store.snapshot()
+    assert snapshot['holdings'] == {}
+    assert snapshot['cash'] == 1000.0
+    assert snapshot['status'] == 'running'
+
+
+def test_published_snapshot_is_not_changed_by_later_edits():
+    store = StateModule(make_state())
+    before = store.snapshot()
+
+    with store.edit('holdings', append_only=['trades']) as state:
+        state['holdings']['X'] = {'quantity': 1, 'avg_price': 10.0}
+        state['trades'].append({'symbol': 'X'})
+        state['cash'] -= 10.0
+
+    assert before == make_state()
+    assert store.snapshot()['holdings'] == {
+        'X': {'quantity': 1, 'avg_price': 10.0}}
+    # Keys not touched by the edit are shared, not copied
+    assert store.snapshot()['last_prices'] is before['last_prices']
+
+
+def test_append_only_keys_share_existing_items():
+    initial = make_state()
+    initial['trades'] = [{'symbol': 'A'}]
+    store = StateModule(initial)
+    before = store.snapshot()
+
+    with store.edit(append_only=['trades']) as state:
+        state['trades'].append({'symbol': 'B'})
+
+    after = store.snapshot()['trades']
+    assert before['trades'] == [{'symbol': 'A'}]
+    assert after[0] is before['trades'][0]
+    assert after[1] == {'symbol': 'B'}
+
+
+def test_background_writer_coalesces_saves(tmp_path):
+    persistence = PersistenceModule(str(tmp_path / 'state.json'))
+    release = threading.Event()
+    written = []
+    save_state = persistence.save_state
+
+    def slow_save(state):
+        release.wait()
+        written.append(state['cash'])
+        return save_state(state)
+
+    persistence.save_state = slow_save
+    writer = BackgroundWriter(persistence)
+    store = StateModule(make_state(), writer)
+
+    for cash in range(10):
+        with store.edit() as state:
+            state['cash'] = float(cash)
+        store.save()
+
+    release.set()
+    assert writer.flush(timeout=5)
+    writer.stop()
+
+    assert written[-1] == 9.0
+    assert len(written) <= 2
+    with open(tmp_path / 'state.json') as f:
+        assert json.load(f)['cash'] == 9.0